@@ -1,6 +1,7 @@
 import asyncio
 import websockets
-import pandas as pd
+import csv
+import numpy as np
 from datetime import datetime
 import os
 
@@ -10,6 +11,7 @@ WEBSOCKET_PORT = 81
 TARGET_EMPTY_WEIGHT_G = 60.0  # 目标空袋重量，用于停止数据收集
 SAVE_INTERVAL_POINTS = 60     # 每收集多少个数据点就保存一次文件
 OUTPUT_DIR = "data/collected_infusion_data" # 数据保存的目录
+INITIAL_BUFFER_ROWS = 4096    # 数据缓冲区初始行数，写满后容量翻倍
 
 # 更新列名以匹配ESP32发送的数据格式 (24列)
 COLUMN_NAMES = [
@@ -20,26 +22,39 @@ COLUMN_NAMES = [
     "rem_t_raw_d_s", "rem_t_filt_d_s", "rem_t_fused_s", "drip_total_drops",
     "drip_initial_weight", "wpd_cumulative"
 ]
+# 热路径中按列下标取值，避免每个数据点都构造dict
+COL_TIMESTAMP_IDX = COLUMN_NAMES.index("timestamp_ms")
+COL_FILT_W_IDX = COLUMN_NAMES.index("filt_w_g")
 
 def ensure_output_dir_exists():
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
         print(f"已创建目录: {OUTPUT_DIR}")
 
-def save_data_to_csv(data_list, filename):
-    if not data_list:
-        print(f"没有数据可保存到 {filename}")
-        return
-    df = pd.DataFrame(data_list)
+def save_data_to_csv(data, filename, start_idx=0):
+    """将二维数组 data[start_idx:] 追加写入CSV（新文件先写表头），返回已写入的总点数"""
+    new_rows = data[start_idx:]
+    if len(new_rows) == 0:
+        print(f"没有新数据可保存到 {filename}")
+        return start_idx
+    write_header = not os.path.exists(filename)
     try:
-        df.to_csv(filename, index=False)
-        print(f"数据已保存到: {filename} (共 {len(data_list)} 个点)")
+        with open(filename, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(COLUMN_NAMES)
+            writer.writerows(new_rows.tolist())
+        print(f"数据已保存到: {filename} (新增 {len(new_rows)} 个点，共 {len(data)} 个点)")
+        return len(data)
     except Exception as e:
         print(f"保存数据到 {filename} 时发生错误: {e}")
+        return start_idx
 
 async def collect_infusion_data():
     uri = f"ws://{ESP32_IP_ADDRESS}:{WEBSOCKET_PORT}/"
-    collected_data_points = []
+    # 预分配的数据缓冲区，每行对应一个数据点，n_points 为已填充的行数
+    data_buf = np.empty((INITIAL_BUFFER_ROWS, len(COLUMN_NAMES)))
+    n_points = 0
     
     ensure_output_dir_exists()
     current_time_str = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -49,7 +64,7 @@ async def collect_infusion_data():
     print(f"收集的数据将保存到: {csv_filename}")
     print(f"每收集 {SAVE_INTERVAL_POINTS} 个数据点将进行一次保存。")
 
-    points_since_last_save = 0
+    last_flushed_idx = 0  # 已写入文件的数据点数
 
     try:
         async with websockets.connect(uri, ping_interval=None) as websocket:
@@ -61,26 +76,26 @@ async def collect_infusion_data():
 
                 if isinstance(message, str) and ',' in message:
                     try:
-                        values = [float(v) for v in message.split(',')]
+                        row = tuple(map(float, message.split(',')))
                         
-                        if len(values) == len(COLUMN_NAMES):
-                            data_point = dict(zip(COLUMN_NAMES, values))
-                            collected_data_points.append(data_point)
-                            points_since_last_save += 1
+                        if len(row) == len(COLUMN_NAMES):
+                            if n_points == len(data_buf):
+                                data_buf = np.concatenate([data_buf, np.empty_like(data_buf)])
+                            data_buf[n_points] = row
+                            n_points += 1
                             
-                            current_filt_weight = data_point['filt_w_g']
-                            print(f"数据点: 时间戳={data_point['timestamp_ms']:.0f}ms, 滤波重量={current_filt_weight:.2f}g, 点数={len(collected_data_points)}")
+                            current_filt_weight = row[COL_FILT_W_IDX]
+                            print(f"数据点: 时间戳={row[COL_TIMESTAMP_IDX]:.0f}ms, 滤波重量={current_filt_weight:.2f}g, 点数={n_points}")
 
-                            if points_since_last_save >= SAVE_INTERVAL_POINTS:
-                                save_data_to_csv(collected_data_points, csv_filename)
-                                points_since_last_save = 0
+                            if n_points - last_flushed_idx >= SAVE_INTERVAL_POINTS:
+                                last_flushed_idx = save_data_to_csv(data_buf[:n_points], csv_filename, last_flushed_idx)
 
                             if current_filt_weight <= TARGET_EMPTY_WEIGHT_G:
                                 print(f"\n目标重量 {TARGET_EMPTY_WEIGHT_G}g 已达到。停止数据收集。")
                                 break
                         else:
                             if not message.lower().startswith("timestamp_ms"): # 避免过多打印表头警告
-                                print(f"警告: 收到数据行，但列数不匹配 ({len(values)} 列，期望 {len(COLUMN_NAMES)} 列): {message[:100]}...")
+                                print(f"警告: 收到数据行，但列数不匹配 ({len(row)} 列，期望 {len(COLUMN_NAMES)} 列): {message[:100]}...")
                     
                     except ValueError:
                         if "<!DOCTYPE html>" in message.lower() or "<html" in message.lower():
@@ -101,9 +116,9 @@ async def collect_infusion_data():
     except Exception as e:
         print(f"在WebSocket通信过程中发生未知错误: {e}")
     finally:
-        if collected_data_points:
+        if n_points:
             print("\n正在进行最终数据保存...")
-            save_data_to_csv(collected_data_points, csv_filename)
+            save_data_to_csv(data_buf[:n_points], csv_filename, last_flushed_idx)
         else:
             print("未收集到任何数据。")
         print("数据收集程序结束。")
@@ -1,4 +1,6 @@
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # 只保存图片，不弹出交互窗口
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
 
@@ -15,7 +17,7 @@ class WeightKalmanFilterPythonImproved:
         self.R_measurement_noise = measurement_noise_R # Measurement noise variance
 
         # State vector: x_state[0] = weight, x_state[1] = velocity
-        self.x_state = np.array([0.0, 0.0])
+        self.x_state = np.array([0.0, 0.0], dtype=float)
 
         # Estimate error covariance matrix P (2x2)
         self.P_cov = np.array([[100.0, 0.0], [0.0, 10.0]]) # Initial high uncertainty
@@ -23,8 +25,12 @@ class WeightKalmanFilterPythonImproved:
         # Measurement matrix H
         self.H_matrix = np.array([[1.0, 0.0]])
 
+        # dt-dependent terms of F and Q, rebuilt only when dt or sigma_a changes
+        self._FQ_key = None
+        self._FQ_cached = None
+
     def init(self, initial_weight, initial_velocity=0.0):
-        self.x_state = np.array([initial_weight, initial_velocity])
+        self.x_state = np.array([initial_weight, initial_velocity], dtype=float)
         # Reset P_cov to initial uncertainty after a known start
         self.P_cov = np.array([[1.0, 0.0], [0.0, 1.0]])
 
@@ -32,50 +38,113 @@ class WeightKalmanFilterPythonImproved:
         if dt <= 0:
             return self.x_state[0]
 
-        # 1. Define State Transition Matrix (F)
-        F_matrix = np.array([[1.0, dt],
-                             [0.0, 1.0]])
-
-        # 2. Define Process Noise Covariance Matrix (Q)
-        dt2 = dt * dt
-        dt3 = dt2 * dt
-        dt4 = dt3 * dt
-        sigma_a_sq = self.sigma_a * self.sigma_a
-
-        Q_process_noise_cov = np.array([
-            [(dt4 / 4.0) * sigma_a_sq, (dt3 / 2.0) * sigma_a_sq],
-            [(dt3 / 2.0) * sigma_a_sq, dt2 * sigma_a_sq]
-        ])
+        # 1. State Transition Matrix F = [[1, dt], [0, 1]] (applied in scalar form below)
+        # 2. Define Process Noise Covariance Matrix (Q), symmetric
+        # With a fixed sample interval these only need to be computed once
+        if (dt, self.sigma_a) != self._FQ_key:
+            dt2 = dt * dt
+            dt3 = dt2 * dt
+            dt4 = dt3 * dt
+            sigma_a_sq = self.sigma_a * self.sigma_a
+            self._FQ_cached = (dt2,
+                               (dt4 / 4.0) * sigma_a_sq,
+                               (dt3 / 2.0) * sigma_a_sq,
+                               dt2 * sigma_a_sq)
+            self._FQ_key = (dt, self.sigma_a)
+        dt2, q00, q01, q11 = self._FQ_cached
 
         # 3. Predict state: x_pred = F * x_state
-        x_pred = F_matrix @ self.x_state
+        w_pred = self.x_state[0] + dt * self.x_state[1]
+        v_pred = self.x_state[1]
 
         # 4. Predict estimate covariance: P_pred = F * P_cov * F_transpose + Q
-        P_pred = F_matrix @ self.P_cov @ F_matrix.T + Q_process_noise_cov
+        # P is symmetric, so only the upper triangle is computed
+        p00 = self.P_cov[0, 0]
+        p01 = self.P_cov[0, 1]
+        p11 = self.P_cov[1, 1]
+        P_pred00 = p00 + 2.0 * dt * p01 + dt2 * p11 + q00
+        P_pred01 = p01 + dt * p11 + q01
+        P_pred11 = p11 + q11
 
         # 5. Calculate Kalman Gain (K)
-        # S_innovation_cov = H * P_pred * H_transpose + R
-        S_innovation_cov = self.H_matrix @ P_pred @ self.H_matrix.T + self.R_measurement_noise
-        if S_innovation_cov[0,0] == 0: S_innovation_cov[0,0] = 1e-9 # Avoid division by zero
-        
-        # K_gain = P_pred * H_transpose * S_inverse
-        K_gain = P_pred @ self.H_matrix.T @ np.linalg.inv(S_innovation_cov)
+        # H = [1, 0], so S = H * P_pred * H_transpose + R is a scalar and
+        # K = P_pred * H_transpose / S is just the first column of P_pred over S
+        S_innovation = P_pred00 + self.R_measurement_noise
+        if S_innovation == 0: S_innovation = 1e-9 # Avoid division by zero
+        K0 = P_pred00 / S_innovation
+        K1 = P_pred01 / S_innovation
 
         # 6. Update state estimate: x_state = x_pred + K_gain * (measurement - H * x_pred)
-        innovation_y = measurement - self.H_matrix @ x_pred
-        self.x_state = x_pred + K_gain @ innovation_y
+        innovation_y = measurement - w_pred
+        self.x_state[0] = w_pred + K0 * innovation_y
+        self.x_state[1] = v_pred + K1 * innovation_y
 
-        # 7. Update estimate covariance: P_cov = (I - K_gain * H) * P_pred
-        I = np.eye(2)
-        self.P_cov = (I - K_gain @ self.H_matrix) @ P_pred
+        # 7. Update estimate covariance: P_cov = P_pred - K_gain * (H * P_pred)
+        # The off-diagonal term is mirrored so P_cov stays exactly symmetric
+        self.P_cov[0, 0] = (1.0 - K0) * P_pred00
+        self.P_cov[0, 1] = self.P_cov[1, 0] = (1.0 - K0) * P_pred01
+        self.P_cov[1, 1] = P_pred11 - K1 * P_pred01
 
         return self.x_state[0]
 
+    def run(self, measurements, dt):
+        # Filter a whole sequence sampled at a fixed dt in one call.
+        # Same recursion as update(), with the state and the symmetric covariance
+        # kept in local scalars instead of one method call per sample; returns (weights, velocities)
+        measurements = np.asarray(measurements, dtype=float)
+        n = len(measurements)
+        if dt <= 0:
+            return np.full(n, self.x_state[0]), np.full(n, self.x_state[1])
+
+        dt2 = dt * dt
+        dt3 = dt2 * dt
+        dt4 = dt3 * dt
+        sigma_a_sq = self.sigma_a * self.sigma_a
+        q00 = (dt4 / 4.0) * sigma_a_sq
+        q01 = (dt3 / 2.0) * sigma_a_sq
+        q11 = dt2 * sigma_a_sq
+        R = self.R_measurement_noise
+
+        w, v = float(self.x_state[0]), float(self.x_state[1])
+        p00, p01, p11 = float(self.P_cov[0, 0]), float(self.P_cov[0, 1]), float(self.P_cov[1, 1])
+        weights = np.empty(n)
+        velocities = np.empty(n)
+        for i in range(n):
+            # Predict
+            w = w + dt * v
+            P_pred00 = p00 + 2.0 * dt * p01 + dt2 * p11 + q00
+            P_pred01 = p01 + dt * p11 + q01
+            P_pred11 = p11 + q11
+
+            # Update with H = [1, 0]
+            S_innovation = P_pred00 + R
+            if S_innovation == 0: S_innovation = 1e-9
+            K0 = P_pred00 / S_innovation
+            K1 = P_pred01 / S_innovation
+            innovation_y = measurements[i] - w
+            w = w + K0 * innovation_y
+            v = v + K1 * innovation_y
+            p00 = (1.0 - K0) * P_pred00
+            p01 = (1.0 - K0) * P_pred01
+            p11 = P_pred11 - K1 * P_pred01
+
+            weights[i] = w
+            velocities[i] = v
+
+        self.x_state[0] = w
+        self.x_state[1] = v
+        self.P_cov[0, 0] = p00
+        self.P_cov[0, 1] = self.P_cov[1, 0] = p01
+        self.P_cov[1, 1] = p11
+        return weights, velocities
+
     def get_velocity(self):
         return self.x_state[1]
 
 
-def simulate_weight_sensor_improved():
+def simulate_weight_sensor_improved(seed=None):
+    # seed: 随机数种子，指定后每次运行生成相同的模拟数据
+    rng = np.random.default_rng(seed)
     # 模拟参数
     total_time = 600  # 总时间 (秒)，例如10分钟
     dt = 1.0  # 时间间隔 (秒)
@@ -91,14 +160,14 @@ def simulate_weight_sensor_improved():
     # 传感器噪声
     measurement_noise_std = 0.5  # g (standard deviation)
     R_val = measurement_noise_std**2 # Variance
-    measurements = true_weight + np.random.normal(0, measurement_noise_std, num_points)
+    # 直接以真实重量为均值采样，一次生成带噪声的测量值
+    measurements = rng.normal(true_weight, measurement_noise_std)
     
     # 模拟病人移动引入的突发噪声
-    spike_indices = [50, 150, 250, 350, 450, 550]
-    spike_magnitudes = [5, -4, 6, -5, 4, -6] # g
-    for i, index in enumerate(spike_indices):
-        if index < num_points:
-            measurements[index] += spike_magnitudes[i]
+    spike_indices = np.array([50, 150, 250, 350, 450, 550])
+    spike_magnitudes = np.array([5, -4, 6, -5, 4, -6], dtype=float) # g
+    in_range = spike_indices < num_points
+    np.add.at(measurements, spike_indices[in_range], spike_magnitudes[in_range])
     
     # 初始化滤波器
     # sigma_a: Controls how much the filter trusts the constant velocity model.
@@ -111,12 +180,7 @@ def simulate_weight_sensor_improved():
     kf = WeightKalmanFilterPythonImproved(sigma_a=sigma_a_param, measurement_noise_R=R_param)
     kf.init(measurements[0], initial_velocity=0.0) # Initial velocity guess
     
-    filtered_weights_improved = np.zeros(num_points)
-    estimated_velocities_improved = np.zeros(num_points)
-    
-    for i in range(num_points):
-        filtered_weights_improved[i] = kf.update(measurements[i], dt)
-        estimated_velocities_improved[i] = kf.get_velocity()
+    filtered_weights_improved, estimated_velocities_improved = kf.run(measurements, dt)
     
     # 绘图
     time_axis = np.arange(0, total_time, dt)
@@ -146,7 +210,7 @@ def simulate_weight_sensor_improved():
     
     image_path = "/tmp/improved_kalman_weight_filter_test.png"
     try:
-        plt.savefig(image_path)
+        plt.savefig(image_path, pil_kwargs={'compress_level': 1})
         print(f"PLOT_IMAGE:{image_path}")
     except Exception as e:
         print(f"Error saving plot: {e}")
@@ -1,4 +1,6 @@
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # 只保存图片，不弹出交互窗口
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
 
@@ -50,7 +52,9 @@ class WeightKalmanFilterPython:
 
         return self.x
 
-def simulate_weight_sensor():
+def simulate_weight_sensor(seed=None):
+    # seed: 随机数种子，指定后每次运行生成相同的模拟数据
+    rng = np.random.default_rng(seed)
     # 模拟参数
     total_time = 600  # 总时间 (秒)，例如10分钟
     dt = 1.0  # 时间间隔 (秒)
@@ -64,14 +68,14 @@ def simulate_weight_sensor():
     
     # 传感器噪声
     measurement_noise_std = 0.5  # g
-    measurements = true_weight + np.random.normal(0, measurement_noise_std, num_points)
+    # 直接以真实重量为均值采样，一次生成带噪声的测量值
+    measurements = rng.normal(true_weight, measurement_noise_std)
     
     # 模拟病人移动引入的突发噪声
-    spike_indices = [50, 150, 250, 350, 450, 550]
-    spike_magnitudes = [5, -4, 6, -5, 4, -6] # g
-    for i, index in enumerate(spike_indices):
-        if index < num_points:
-            measurements[index] += spike_magnitudes[i]
+    spike_indices = np.array([50, 150, 250, 350, 450, 550])
+    spike_magnitudes = np.array([5, -4, 6, -5, 4, -6], dtype=float) # g
+    in_range = spike_indices < num_points
+    np.add.at(measurements, spike_indices[in_range], spike_magnitudes[in_range])
             
     # 初始化滤波器 (使用C++代码中的默认参数或根据需要调整)
     # processNoise = 0.1, measurementNoise = 1.0
@@ -116,7 +120,7 @@ def simulate_weight_sensor():
     # 将图像保存到临时文件
     image_path = "/tmp/kalman_weight_filter_test.png"
     try:
-        plt.savefig(image_path)
+        plt.savefig(image_path, pil_kwargs={'compress_level': 1})
         print(f"PLOT_IMAGE:{image_path}") # 特殊标记，让工具显示图片
     except Exception as e:
         print(f"Error saving plot: {e}")
@@ -1,10 +1,21 @@
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # 只保存图片，不弹出交互窗口
 import matplotlib.pyplot as plt
 
+try:
+    from numba import njit
+except ImportError:  # 未安装numba时退化为普通Python函数，结果相同只是更慢
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 # ========== 1. 读取数据 ==========
 # 读取data/collected_infusion_data目录下的所有csv文件
 import glob
+import math
 import os
 
 csv_files = glob.glob('data/collected_infusion_data/*.csv')
@@ -17,7 +28,14 @@ for i, f in enumerate(csv_files):
 
 # 选择要读取第几个文件
 file_index = 0  # 可以修改这个索引来选择不同的文件
-df = pd.read_csv(csv_files[file_index])
+# 只读取后续用到的列（含旧版列名），全部按float64解析，省去类型推断
+USED_COLUMNS = {
+    'timestamp_ms', 'raw_w_g', 'raw_dps', 'raw_flow_w_gps', 'raw_flow_d_gps', 'rem_weight_drip_g',
+    'drip_total_drops', 'total_drops_for_volume_calc',
+    'drip_initial_weight', 'known_initial_total_weight_g',
+}
+df = pd.read_csv(csv_files[file_index], usecols=lambda c: c in USED_COLUMNS,
+                 dtype=np.float64, engine='c')
 print(f"\n已选择文件: {os.path.basename(csv_files[file_index])}")
 
 timestamp = df['timestamp_ms'].values / 1000.0
@@ -68,63 +86,114 @@ wpd_R = 1e-4  # WPD测量噪声方差
 wpd_x0 = 0.05 # WPD初始值
 
 # ========== 3. WeightKalmanFilter ==========
+@njit(cache=True)
+def _weight_kf_core(raw_weight, dt, sigma_a, sigma_j, R):
+    n = len(raw_weight)
+    weight = np.empty(n)
+    vel = np.empty(n)
+    acc = np.empty(n)
+    # 状态 [位置,速度,加速度]，P 对称，只保存上三角的6个元素
+    w, v, a = float(raw_weight[0]), 0.0, 0.0
+    p00, p01, p02, p11, p12, p22 = 10.0, 0.0, 0.0, 10.0, 0.0, 10.0
+    weight[0], vel[0], acc[0] = w, v, a
+    sa2 = sigma_a * sigma_a
+    sj2 = sigma_j * sigma_j
+
+    for k in range(1, n):
+        dt_k = dt[k]
+        dt2 = dt_k * dt_k
+        h = 0.5 * dt2  # F = [[1, dt, dt^2/2], [0, 1, dt], [0, 0, 1]]
+
+        # 预测: x_pred = F x
+        w = w + dt_k * v + h * a
+        v = v + dt_k * a
+
+        # 预测: P_pred = F P F^T + Q，先算 A = F P，再算 A F^T
+        a00 = p00 + dt_k * p01 + h * p02
+        a01 = p01 + dt_k * p11 + h * p12
+        a02 = p02 + dt_k * p12 + h * p22
+        a11 = p11 + dt_k * p12
+        a12 = p12 + dt_k * p22
+        m00 = a00 + dt_k * a01 + h * a02 + sa2 * dt2 * dt2 / 4
+        m01 = a01 + dt_k * a02 + sa2 * dt2 * dt_k / 2
+        m02 = a02 + sa2 * dt2 / 2
+        m11 = a11 + dt_k * a12 + sa2 * dt2
+        m12 = a12 + sa2 * dt_k
+        m22 = p22 + sj2
+
+        # 更新: H = [1, 0, 0]，S 为标量，K = P_pred 第一列 / S
+        S = m00 + R
+        k0 = m00 / S
+        k1 = m01 / S
+        k2 = m02 / S
+        y = raw_weight[k] - w
+        w += k0 * y
+        v += k1 * y
+        a += k2 * y
+        # P = P_pred - K (H P_pred)
+        p00 = m00 - k0 * m00
+        p01 = m01 - k0 * m01
+        p02 = m02 - k0 * m02
+        p11 = m11 - k1 * m01
+        p12 = m12 - k1 * m02
+        p22 = m22 - k2 * m02
+
+        weight[k], vel[k], acc[k] = w, v, a
+
+    return weight, vel, acc
+
 def run_weight_kf(raw_weight, dt, sigma_a, sigma_j, R):
-    x = np.zeros((3, len(raw_weight)))  # [位置,速度,加速度]
-    P = np.zeros((3, 3, len(raw_weight)))
-    x[:, 0] = [raw_weight[0], 0, 0]  # 初始状态
-    P[:, :, 0] = np.eye(3) * 10
-    
-    for k in range(1, len(raw_weight)):
-        # 状态转移矩阵
-        F = np.array([[1, dt[k], dt[k]**2/2],
-                     [0, 1, dt[k]],
-                     [0, 0, 1]])
-        
-        # 过程噪声协方差矩阵
-        Q = np.array([[sigma_a**2 * dt[k]**4/4, sigma_a**2 * dt[k]**3/2, sigma_a**2 * dt[k]**2/2],
-                      [sigma_a**2 * dt[k]**3/2, sigma_a**2 * dt[k]**2, sigma_a**2 * dt[k]],
-                      [sigma_a**2 * dt[k]**2/2, sigma_a**2 * dt[k], sigma_j**2]])
-        
-        # 预测
-        x_pred = F @ x[:, k-1]
-        P_pred = F @ P[:, :, k-1] @ F.T + Q
-        
-        # 更新
-        H = np.array([[1, 0, 0]])  # 观测矩阵
-        z = np.array([raw_weight[k]])
-        y = z - H @ x_pred
-        S = H @ P_pred @ H.T + R
-        K = P_pred @ H.T / S
-        x[:, k] = x_pred + (K.flatten() * y)
-        P[:, :, k] = (np.eye(3) - K @ H) @ P_pred
-        
-    return x[0], x[1], x[2]  # 重量, 速度, 加速度
+    return _weight_kf_core(np.asarray(raw_weight, dtype=np.float64), np.asarray(dt, dtype=np.float64),
+                           float(sigma_a), float(sigma_j), float(R))  # 重量, 速度, 加速度
 
 # ========== 4. DripKalmanFilter ==========
+@njit(cache=True)
+def _drip_kf_core(raw_drip_rate, dt, sigma_a, R):
+    n = len(raw_drip_rate)
+    rate = np.empty(n)
+    rate_vel = np.empty(n)
+    # 状态 [滴速,滴速变化率]，P 对称，只保存上三角的3个元素
+    r, rv = float(raw_drip_rate[0]), 0.0
+    p00, p01, p11 = 1.0, 0.0, 1.0
+    rate[0], rate_vel[0] = r, rv
+    sa2 = sigma_a * sigma_a
+
+    for k in range(1, n):
+        dt_k = dt[k]
+        dt2 = dt_k * dt_k
+
+        # 预测: F = [[1, dt], [0, 1]]
+        r = r + dt_k * rv
+        m00 = p00 + 2.0 * dt_k * p01 + dt2 * p11 + sa2 * dt2 * dt2 / 4
+        m01 = p01 + dt_k * p11 + sa2 * dt2 * dt_k / 2
+        m11 = p11 + sa2 * dt2
+
+        # 更新: H = [1, 0]
+        S = m00 + R
+        k0 = m00 / S
+        k1 = m01 / S
+        y = raw_drip_rate[k] - r
+        r += k0 * y
+        rv += k1 * y
+        p00 = m00 - k0 * m00
+        p01 = m01 - k0 * m01
+        p11 = m11 - k1 * m01
+
+        rate[k], rate_vel[k] = r, rv
+
+    return rate, rate_vel
+
 def run_drip_kf(raw_drip_rate, dt, sigma_a, R):
-    x = np.zeros((2, len(raw_drip_rate)))
-    P = np.zeros((2, 2, len(raw_drip_rate)))
-    x[:, 0] = [raw_drip_rate[0], 0]
-    P[:, :, 0] = np.eye(2) * 1
-    for k in range(1, len(raw_drip_rate)):
-        F = np.array([[1, dt[k]], [0, 1]])
-        Q = sigma_a**2 * np.array([[dt[k]**4/4, dt[k]**3/2], [dt[k]**3/2, dt[k]**2]])
-        x_pred = F @ x[:, k-1]
-        P_pred = F @ P[:, :, k-1] @ F.T + Q
-        H = np.array([[1, 0]])
-        z = np.array([raw_drip_rate[k]])
-        y = z - H @ x_pred
-        S = H @ P_pred @ H.T + R
-        K = P_pred @ H.T / S
-        x[:, k] = x_pred + (K.flatten() * y)
-        P[:, :, k] = (np.eye(2) - K @ H) @ P_pred
-    return x[0], x[1]  # 滴速, 滴速变化率
+    return _drip_kf_core(np.asarray(raw_drip_rate, dtype=np.float64), np.asarray(dt, dtype=np.float64),
+                         float(sigma_a), float(R))  # 滴速, 滴速变化率
 
-def kalman_1d(measurements, Q=1e-6, R=1e-3, x0=0.05):
-    x = np.zeros_like(measurements)
+@njit(cache=True)
+def _kalman_1d_core(measurements, Q, R, x0):
+    x = np.empty_like(measurements)
     P = 1.0
     for k in range(len(measurements)):
-        if np.isnan(measurements[k]) or measurements[k] < 0.04 or measurements[k] > 0.07:
+        z = measurements[k]
+        if math.isnan(z) or z < 0.04 or z > 0.07:
             if k > 0:
                 x[k] = x[k-1]
             else:
@@ -133,64 +202,77 @@ def kalman_1d(measurements, Q=1e-6, R=1e-3, x0=0.05):
         P = P + Q
         K = P / (P + R)
         if k == 0:
-            x[k] = measurements[k]
+            x[k] = z
         else:
-            x[k] = x[k-1] + K * (measurements[k] - x[k-1])
+            x[k] = x[k-1] + K * (z - x[k-1])
         P = (1 - K) * P
         # 限制wpd在0.04-0.07之间
-        x[k] = np.clip(x[k], 0.0, 0.07)
+        x[k] = min(max(x[k], 0.0), 0.07)
     return x
 
+def kalman_1d(measurements, Q=1e-6, R=1e-3, x0=0.05):
+    return _kalman_1d_core(np.asarray(measurements, dtype=np.float64), float(Q), float(R), float(x0))
+
 # ========== 5. DataFusion ==========
-def run_data_fusion(flow_weight, flow_drip, rem_weight_weight, rem_weight_drip, dt, 
-                    q_flow, r_weight_flow, r_drip_flow, q_weight, r_weight_weight, r_drip_weight):
+@njit(cache=True)
+def _fuse_core(flow_weight, flow_drip, rem_weight_weight, rem_weight_drip, dt,
+               q_flow, r_weight_flow, r_drip_flow, q_weight, r_weight_weight, r_drip_weight):
     n = len(flow_weight)
-    fused_flow = np.zeros(n)
-    fused_weight = np.zeros(n)
+    fused_flow = np.empty(n)
+    fused_weight = np.empty(n)
     P_flow = 1.0
     P_weight = 10.0
-    fused_flow[0] = flow_weight[0]
-    fused_weight[0] = rem_weight_weight[0]
+    f = flow_weight[0]
+    w = rem_weight_weight[0]
+    fused_flow[0] = f
+    fused_weight[0] = w
+    # 同一时刻的两路观测合并为一次信息滤波更新：1/P = 1/P_pred + 1/r1 + 1/r2
+    inv_r_weight_flow = 1.0 / r_weight_flow
+    inv_r_drip_flow = 1.0 / r_drip_flow
+    inv_r_weight_weight = 1.0 / r_weight_weight
+    inv_r_drip_weight = 1.0 / r_drip_weight
     for k in range(1, n):
         # 预测
-        P_flow += q_flow * dt[k]
-        P_weight += q_weight * dt[k]
-        fused_weight[k] = fused_weight[k-1] - fused_flow[k-1] * dt[k]
-        if fused_weight[k] < 0: fused_weight[k] = 0
+        P_flow_pred = P_flow + q_flow * dt[k]
+        P_weight_pred = P_weight + q_weight * dt[k]
+        w = w - f * dt[k]
+        if w < 0: w = 0.0
         # 流速更新
-        K1 = P_flow / (P_flow + r_weight_flow)
-        fused_flow[k] = fused_flow[k-1] + K1 * (flow_weight[k] - fused_flow[k-1])
-        P_flow = (1 - K1) * P_flow
-        K2 = P_flow / (P_flow + r_drip_flow)
-        fused_flow[k] = fused_flow[k] + K2 * (flow_drip[k] - fused_flow[k])
-        P_flow = (1 - K2) * P_flow
+        P_flow = 1.0 / (1.0 / P_flow_pred + inv_r_weight_flow + inv_r_drip_flow)
+        f = P_flow * (f / P_flow_pred + flow_weight[k] * inv_r_weight_flow + flow_drip[k] * inv_r_drip_flow)
         # 剩余重量更新
-        K3 = P_weight / (P_weight + r_weight_weight)
-        fused_weight[k] = fused_weight[k] + K3 * (rem_weight_weight[k] - fused_weight[k])
-        P_weight = (1 - K3) * P_weight
-        K4 = P_weight / (P_weight + r_drip_weight)
-        fused_weight[k] = fused_weight[k] + K4 * (rem_weight_drip[k] - fused_weight[k])
-        P_weight = (1 - K4) * P_weight
-        if fused_weight[k] < 0: fused_weight[k] = 0
+        P_weight = 1.0 / (1.0 / P_weight_pred + inv_r_weight_weight + inv_r_drip_weight)
+        w = P_weight * (w / P_weight_pred + rem_weight_weight[k] * inv_r_weight_weight
+                        + rem_weight_drip[k] * inv_r_drip_weight)
+        if w < 0: w = 0.0
+        fused_flow[k] = f
+        fused_weight[k] = w
     return fused_flow, fused_weight
 
+def run_data_fusion(flow_weight, flow_drip, rem_weight_weight, rem_weight_drip, dt, 
+                    q_flow, r_weight_flow, r_drip_flow, q_weight, r_weight_weight, r_drip_weight):
+    # 信息滤波形式需要 1/r，测量噪声方差必须为正
+    if min(r_weight_flow, r_drip_flow, r_weight_weight, r_drip_weight) <= 0:
+        raise ValueError("数据融合的测量噪声方差 r_* 必须大于0")
+    arrays = [np.asarray(a, dtype=np.float64)
+              for a in (flow_weight, flow_drip, rem_weight_weight, rem_weight_drip, dt)]
+    return _fuse_core(*arrays, float(q_flow), float(r_weight_flow), float(r_drip_flow),
+                      float(q_weight), float(r_weight_weight), float(r_drip_weight))
+
 # ========== 6. 剩余时间预测与理想线性剩余时间 ==========
 def calc_remaining_time(weight, flow, target_weight):
-    rem = weight - target_weight
-    rem[rem < 0] = 0
-    flow[flow < 1e-5] = 1e-5  # 防止除零
-    remaining_time = rem / flow
+    rem = np.maximum(weight - target_weight, 0)
+    # 防止除零；np.maximum 返回新数组，不会改写调用方传入的 flow
+    remaining_time = rem / np.maximum(flow, 1e-5)
     # 限制剩余时间范围在0-10000秒之间
-    remaining_time[remaining_time > 10000] = 10000
-    # 计算进度
-    progress = 1 - rem / (weight[0] - target_weight)
-    progress[progress < 0] = 0
-    progress[progress > 1] = 1
+    np.minimum(remaining_time, 10000, out=remaining_time)
+    # 计算进度（进度由各自的重量估计得到，三种方法之间不能共用）
+    progress = np.clip(1 - rem / (weight[0] - target_weight), 0, 1)
     # # 应用系数
     # coef = 11.5 * (1 - progress)
     # remaining_time = remaining_time * (1 + coef)**0.16
     coef = (1 - progress)*11.5
-    remaining_time  = remaining_time * (1 + coef)**0.16
+    remaining_time *= (1 + coef)**0.16
     return remaining_time
 
 def calc_ideal_remaining_time(timestamp, fused_weight, target_weight):
@@ -216,11 +298,9 @@ if __name__ == '__main__':
     # 设置输液结束阈值为最后一个点的滤波后重量
     target_empty_weight = filt_weight[-1]
     # 2. WPD累计法与卡尔曼滤波
-    wpd_cumulative = np.full_like(raw_weight, np.nan)
-    for k in range(1, len(raw_weight)):
-        drops_diff = drip_total_drops[k] - drip_total_drops[0]
-        if drops_diff > 0:
-            wpd_cumulative[k] = (raw_weight[0] - raw_weight[k]) / drops_diff
+    drops_diff = drip_total_drops - drip_total_drops[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        wpd_cumulative = np.where(drops_diff > 0, (raw_weight[0] - raw_weight) / drops_diff, np.nan)
     wpd_kf = kalman_1d(wpd_cumulative, wpd_Q, wpd_R, wpd_x0)
     # 3. 滴速卡尔曼滤波（用滤波WPD）
     filt_drip_rate, _ = run_drip_kf(raw_drip_rate, dt, drip_sigma_a, drip_R)
@@ -242,53 +322,63 @@ if __name__ == '__main__':
     # 定义异常值过滤函数
     def filter_outliers(data, threshold=3):
         """
-        使用z-score方法剔除异常值
+        使用z-score方法剔除异常值，data 为一维信号或按行堆叠的多条信号（逐行统计）
         threshold: z-score阈值，默认为3
+        返回过滤后的数据（异常值置为NaN）和有效点掩码
         """
-        if np.all(np.isnan(data)):
-            return data
-        
-        # 创建掩码，初始所有点都是有效的
-        mask = ~np.isnan(data)
+        valid = ~np.isnan(data)
+        count = valid.sum(axis=-1, keepdims=True)
         
-        # 计算均值和标准差（忽略NaN值）
-        mean = np.nanmean(data)
-        std = np.nanstd(data)
+        # 计算每条信号的均值和标准差：NaN位置只屏蔽一次，之后用普通求和代替nanmean/nanstd
+        # 整行为NaN时 count 为0，得到的 mean/std 为NaN
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(valid, data, 0.0).sum(axis=-1, keepdims=True) / count
+            dev = np.where(valid, data - mean, 0.0)
+            std = np.sqrt((dev * dev).sum(axis=-1, keepdims=True) / count)
         
-        if std == 0:  # 防止除零错误
-            return data
+        # 标记异常值；std为0（或整行为NaN）的信号不做剔除，防止除零
+        keep_all = ~(std > 0)
+        mask = valid & ((np.abs(dev) < threshold * std) | keep_all)
         
-        # 计算z-scores
-        z_scores = np.abs((data - mean) / std)
-        
-        # 标记异常值
-        mask = mask & (z_scores < threshold)
-        
-        # 创建过滤后的数据副本
-        filtered_data = data.copy()
-        filtered_data[~mask] = np.nan
-        
-        return filtered_data, mask
+        return np.where(mask, data, np.nan), mask
     
-     # 图1：剩余时间对比（剔除异常值）
-    plt.figure(figsize=(12, 6))
-    # 过滤异常值
-    weight_rem_time_filtered, _ = filter_outliers(weight_rem_time)
-    drip_rem_time_filtered, _ = filter_outliers(drip_rem_time)
-    fused_rem_time_filtered, _ = filter_outliers(fused_rem_time)
+    # 剩余时间的误差和后50% MAE是调参指标，按全分辨率剔除异常值，不受绘图抽样影响
+    (weight_rem_time_filtered, drip_rem_time_filtered,
+     fused_rem_time_filtered), _ = filter_outliers(np.vstack([
+        weight_rem_time, drip_rem_time, fused_rem_time,
+    ]))
+    
+    # 其余信号只用于显示：先按 plot_idx 抽样，异常值过滤和绘图都只处理要显示的点
+    # 卡尔曼滤波和融合在float64下完成，之后仅用于显示的信号转为float32，减少后续各趟计算的内存读写
+    # 时间轴保留float64
+    timestamp_p = timestamp[plot_idx]
     
-    plt.plot(timestamp[plot_idx], weight_rem_time_filtered[plot_idx], '-', color='lightblue', markersize=4, label='Weight Sensor Remaining Time')
-    plt.plot(timestamp[plot_idx], drip_rem_time_filtered[plot_idx], '-', color='lightgreen', markersize=4, label='Drip Sensor Remaining Time')
-    plt.plot(timestamp[plot_idx], fused_rem_time_filtered[plot_idx], '-', color='red', label='Fused Remaining Time')
-    plt.plot(timestamp[plot_idx], ideal_rem_time[plot_idx], '--', color='purple', label='Ideal Remaining Time')
-    plt.xlabel('Time (s)')
-    plt.ylabel('Remaining Time (s)')
-    plt.legend()
-    plt.title('Comparison of Remaining Time Prediction Methods')
-    plt.grid(True)
+    # 这些信号长度相同，堆叠后一次性过滤异常值（结果均为抽样后的float32数据）
+    (wpd_cumulative_filtered, raw_weight_filtered,
+     raw_flow_weight_gps_filtered, filt_weight_vel_filtered,
+     raw_flow_drip_gps_filtered, filt_drip_flow_gps_filtered), _ = filter_outliers(np.vstack([
+        signal[plot_idx].astype(np.float32) for signal in (
+            wpd_cumulative, raw_weight,
+            raw_flow_weight_gps, -filt_weight_vel,
+            raw_flow_drip_gps, filt_drip_flow_gps,
+        )
+    ]))
+    
+    # 所有图共用一个Figure，每张图之前清空坐标轴，避免反复创建/销毁Figure
+    fig, ax = plt.subplots(figsize=(12, 6))
+    
+     # 图1：剩余时间对比（剔除异常值）
+    ax.plot(timestamp_p, weight_rem_time_filtered[plot_idx], '-', color='lightblue', markersize=4, label='Weight Sensor Remaining Time')
+    ax.plot(timestamp_p, drip_rem_time_filtered[plot_idx], '-', color='lightgreen', markersize=4, label='Drip Sensor Remaining Time')
+    ax.plot(timestamp_p, fused_rem_time_filtered[plot_idx], '-', color='red', label='Fused Remaining Time')
+    ax.plot(timestamp_p, ideal_rem_time[plot_idx], '--', color='purple', label='Ideal Remaining Time')
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Remaining Time (s)')
+    ax.legend()
+    ax.set_title('Comparison of Remaining Time Prediction Methods')
+    ax.grid(True)
     
     # 设置横纵轴相同宽度
-    ax = plt.gca()
     ax.set_aspect('equal')
     
     # 获取当前轴的范围
@@ -303,8 +393,10 @@ if __name__ == '__main__':
     ax.set_xlim(plot_min, plot_max)
     ax.set_ylim(plot_min, plot_max)
     
-    plt.savefig('data/fig/1.剩余时间对比.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    # 图1为等比例的方形坐标轴，保留bbox_inches='tight'裁掉两侧空白
+    # 其余图改用tight_layout，省去保存时额外的一次渲染
+    # PNG使用低压缩级别保存：文件略大，但编码耗时明显减少
+    fig.savefig('data/fig/1.剩余时间对比.png', dpi=300, bbox_inches='tight', pil_kwargs={'compress_level': 1})
 
     # 计算误差
     weight_error = weight_rem_time_filtered - ideal_rem_time
@@ -320,69 +412,60 @@ if __name__ == '__main__':
     fused_mae = np.nanmean(np.abs(fused_error[start_idx:]))
 
     # 图1.1：误差对比
-    plt.figure(figsize=(12, 6))
-    plt.plot(timestamp[plot_idx], weight_error[plot_idx], '-', color='lightblue', markersize=4, 
-             label=f'Weight Sensor Error (Last 50% MAE: {weight_mae:.2f}s)')
-    plt.plot(timestamp[plot_idx], drip_error[plot_idx], '-', color='lightgreen', markersize=4, 
-             label=f'Drip Sensor Error (Last 50% MAE: {drip_mae:.2f}s)')
-    plt.plot(timestamp[plot_idx], fused_error[plot_idx], '-', color='red', 
-             label=f'Fused Error (Last 50% MAE: {fused_mae:.2f}s)')
-    plt.axhline(y=0, color='black', linestyle='--', label='Zero Error')
-    plt.axvline(x=timestamp[start_idx], color='gray', linestyle='--', label='50% Mark')
-    plt.xlabel('Time (s)')
-    plt.ylabel('Error (s)')
-    plt.legend()
-    plt.title('Error Analysis of Remaining Time Predictions (Last 50% MAE)')
-    plt.grid(True)
-    plt.savefig('data/fig/1.1.剩余时间误差.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    ax.cla()
+    ax.set_aspect('auto')  # cla()不会恢复图1设置的等比例坐标轴
+    ax.plot(timestamp_p, weight_error[plot_idx], '-', color='lightblue', markersize=4, 
+            label=f'Weight Sensor Error (Last 50% MAE: {weight_mae:.2f}s)')
+    ax.plot(timestamp_p, drip_error[plot_idx], '-', color='lightgreen', markersize=4, 
+            label=f'Drip Sensor Error (Last 50% MAE: {drip_mae:.2f}s)')
+    ax.plot(timestamp_p, fused_error[plot_idx], '-', color='red', 
+            label=f'Fused Error (Last 50% MAE: {fused_mae:.2f}s)')
+    ax.axhline(y=0, color='black', linestyle='--', label='Zero Error')
+    ax.axvline(x=timestamp[start_idx], color='gray', linestyle='--', label='50% Mark')
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Error (s)')
+    ax.legend()
+    ax.set_title('Error Analysis of Remaining Time Predictions (Last 50% MAE)')
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig('data/fig/1.1.剩余时间误差.png', dpi=300, pil_kwargs={'compress_level': 1})
     
     # 图2：WPD对比（剔除异常值）
-    plt.figure(figsize=(12, 6))
-    # 过滤异常值
-    wpd_cumulative_filtered, _ = filter_outliers(wpd_cumulative)
-    
-    plt.plot(timestamp[plot_idx], wpd_cumulative_filtered[plot_idx], '.', color='lightcoral', markersize=2, label='Raw WPD (Cumulative)')
-    plt.plot(timestamp[plot_idx], wpd_kf[plot_idx], '-', color='red', label='Filtered WPD (Kalman)')
-    plt.xlabel('Time (s)')
-    plt.ylabel('Weight Per Drop (g/drop)')
-    plt.legend()
-    plt.ylim(0.03, 0.07)
-    plt.title('Comparison of Raw and Filtered WPD')
-    plt.grid(True)
-    plt.savefig('data/fig/2.WPD对比.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    ax.cla()
+    ax.plot(timestamp_p, wpd_cumulative_filtered, '.', color='lightcoral', markersize=2, label='Raw WPD (Cumulative)')
+    ax.plot(timestamp_p, wpd_kf[plot_idx], '-', color='red', label='Filtered WPD (Kalman)')
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Weight Per Drop (g/drop)')
+    ax.legend()
+    ax.set_ylim(0.03, 0.07)
+    ax.set_title('Comparison of Raw and Filtered WPD')
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig('data/fig/2.WPD对比.png', dpi=300, pil_kwargs={'compress_level': 1})
     
     # 图3：重量对比
-    plt.figure(figsize=(12, 6))
-    # 过滤异常值
-    raw_weight_filtered, _ = filter_outliers(raw_weight)
-    
-    plt.plot(timestamp, raw_weight_filtered, '-', color='lightblue', markersize=4, label='Raw Weight')
-    plt.plot(timestamp, filt_weight, '-', color='blue', label='Filtered Weight')
-    plt.plot(timestamp, drip_est_weight, '-', color='green', label='Drip Estimated Weight')
-    plt.plot(timestamp, fused_weight, '-', color='red', label='Fused Weight')
-    plt.axhline(target_empty_weight, color='black', linestyle='--', label='Target Empty Weight')
-    plt.xlabel('Time (s)')
-    plt.ylabel('Weight (g)')
-    # plt.xlim(200, 1500)
-    # plt.ylim(480, 580)
-    plt.legend()
-    plt.title('Comparison of Weight Measurement Methods')
-    plt.grid(True)
-    plt.savefig('data/fig/3.重量对比.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    ax.cla()
+    ax.plot(timestamp_p, raw_weight_filtered, '-', color='lightblue', markersize=4, label='Raw Weight')
+    ax.plot(timestamp_p, filt_weight[plot_idx], '-', color='blue', label='Filtered Weight')
+    ax.plot(timestamp_p, drip_est_weight[plot_idx], '-', color='green', label='Drip Estimated Weight')
+    ax.plot(timestamp_p, fused_weight[plot_idx], '-', color='red', label='Fused Weight')
+    ax.axhline(target_empty_weight, color='black', linestyle='--', label='Target Empty Weight')
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Weight (g)')
+    # ax.set_xlim(200, 1500)
+    # ax.set_ylim(480, 580)
+    ax.legend()
+    ax.set_title('Comparison of Weight Measurement Methods')
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig('data/fig/3.重量对比.png', dpi=300, pil_kwargs={'compress_level': 1})
     
     # 图4：流速对比
-    plt.figure(figsize=(12, 6))
-    # 过滤异常值
-    raw_flow_weight_gps_filtered, _ = filter_outliers(raw_flow_weight_gps)
-    filt_weight_vel_filtered, _ = filter_outliers(-filt_weight_vel)
-    raw_flow_drip_gps_filtered, _ = filter_outliers(raw_flow_drip_gps) 
-    filt_drip_flow_gps_filtered, _ = filter_outliers(filt_drip_flow_gps)
+    ax.cla()
     
     # 计算融合流速的范围
-    fused_flow_valid = fused_flow[~np.isnan(fused_flow)]
+    fused_flow_p = fused_flow[plot_idx]
+    fused_flow_valid = fused_flow_p[~np.isnan(fused_flow_p)]
     
     if len(fused_flow_valid) > 0:
         flow_min = np.min(fused_flow_valid)
@@ -393,18 +476,19 @@ if __name__ == '__main__':
         y_min = max(0, flow_min - y_range * 0.1)  # 不小于0
         y_max = flow_max + y_range * 0.1
         
-        plt.plot(timestamp[plot_idx], raw_flow_weight_gps_filtered[plot_idx], '.', color='lightblue', markersize=3, label='Raw Flow Rate (Weight)')
-        plt.plot(timestamp[plot_idx], filt_weight_vel_filtered[plot_idx], '-', color='blue', label='Filtered Flow Rate (Weight)')
-        plt.plot(timestamp[plot_idx], raw_flow_drip_gps_filtered[plot_idx], '.', color='lightgreen', markersize=3, label='Raw Flow Rate (Drip)')
-        plt.plot(timestamp[plot_idx], filt_drip_flow_gps_filtered[plot_idx], '-', color='green', label='Filtered Flow Rate (Drip)')
-        plt.plot(timestamp[plot_idx], fused_flow[plot_idx], '-', color='red', label='Fused Flow Rate')
-        plt.xlabel('Time (s)')
-        plt.ylabel('Flow Rate (g/s)')
-        plt.ylim(y_min, y_max)
-        plt.legend()
-        plt.title('Comparison of Flow Rate Measurement Methods')
-        plt.grid(True)
-        plt.savefig('data/fig/4.流速对比.png', dpi=300, bbox_inches='tight')
-        plt.close()
+        ax.plot(timestamp_p, raw_flow_weight_gps_filtered, '.', color='lightblue', markersize=3, label='Raw Flow Rate (Weight)')
+        ax.plot(timestamp_p, filt_weight_vel_filtered, '-', color='blue', label='Filtered Flow Rate (Weight)')
+        ax.plot(timestamp_p, raw_flow_drip_gps_filtered, '.', color='lightgreen', markersize=3, label='Raw Flow Rate (Drip)')
+        ax.plot(timestamp_p, filt_drip_flow_gps_filtered, '-', color='green', label='Filtered Flow Rate (Drip)')
+        ax.plot(timestamp_p, fused_flow_p, '-', color='red', label='Fused Flow Rate')
+        ax.set_xlabel('Time (s)')
+        ax.set_ylabel('Flow Rate (g/s)')
+        ax.set_ylim(y_min, y_max)
+        ax.legend()
+        ax.set_title('Comparison of Flow Rate Measurement Methods')
+        ax.grid(True)
+        fig.tight_layout()
+        fig.savefig('data/fig/4.流速对比.png', dpi=300, pil_kwargs={'compress_level': 1})
     else:
         print("警告: 所有流速数据均为NaN,无法绘图")
+    plt.close(fig)